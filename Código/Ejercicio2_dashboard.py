@@ -1,13 +1,16 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import folium
-from streamlit_folium import st_folium
 import requests
+from requests.adapters import HTTPAdapter
 import io
-import seaborn as sns
-import matplotlib.pyplot as plt
+import uuid
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import folium
 
 # Cambiar colores y diseño
 CUSTOM_BLUE = "#1E3A8A"
@@ -15,8 +18,28 @@ CUSTOM_YELLOW = "#FBBF24"
 CUSTOM_GRAY = "#E5E7EB"
 CUSTOM_WHITE = "#FFFFFF"
 
-# Aplicando el estilo
-st.markdown(f"""
+# Columnas de texto que no se convierten a numéricas
+TEXT_COLS = ['departamento', 'municipio']
+
+# Sesión HTTP reutilizada entre recargas de la aplicación (evita repetir el handshake TLS)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# Tipos conocidos de las columnas de la API
+SCHEMA = {
+    'a_o': 'int16',
+    'departamento': 'category',
+    'municipio': 'category',
+    'poblaci_n_5_16': 'float32',
+    'tasa_matriculaci_n_5_16': 'float32',
+    'cobertura_neta': 'float32',
+    'cobertura_bruta': 'float32',
+    'lat': 'float32',
+    'lon': 'float32',
+}
+
+# Hoja de estilo construida una sola vez
+_CSS = f"""
     <style>
     .main {{
         background-color: {CUSTOM_GRAY};
@@ -48,12 +71,34 @@ st.markdown(f"""
         border: 1px solid #CCC;
     }}
     </style>
-""", unsafe_allow_html=True)
+"""
+
+# Lectura del CSV de Socrata con los tipos conocidos de SCHEMA
+def parse_csv(content: bytes) -> pd.DataFrame:
+    df = pd.read_csv(io.BytesIO(content), engine='pyarrow')
+    tipos = {col: dtype for col, dtype in SCHEMA.items() if col in df.columns}
+
+    # Valores no numéricos como "ND" pasan a NaN para que la limpieza los descarte
+    numericas = [col for col, dtype in tipos.items() if dtype != 'category']
+    df[numericas] = df[numericas].apply(pd.to_numeric, errors='coerce')
+
+    # Los enteros con faltantes se mantienen en float hasta la limpieza
+    tipos = {col: dtype for col, dtype in tipos.items() if not (dtype.startswith('int') and df[col].isna().any())}
+    return df.astype(tipos, copy=False)
+
+# Descarga cacheada: el límite es la llave del caché y los errores no se cachean
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_data(limit: int) -> pd.DataFrame:
+    api_url = f"https://www.datos.gov.co/resource/nudc-7mev.csv?$limit={limit}"
+    response = SESSION.get(api_url, headers={"Accept-Encoding": "gzip"}, timeout=30)
+    response.raise_for_status()  # Verifica si la respuesta fue exitosa
+    return parse_csv(response.content)
 
 # Función para cargar datos desde la API
 def load_data_from_api(limit: int = 50000) -> pd.DataFrame:
     """
-    Carga datos desde la API de Socrata en formato JSON y los convierte en un DataFrame de pandas.
+    Carga datos desde la API de Socrata en formato CSV y los convierte en un DataFrame de pandas.
+    El resultado se guarda en caché durante una hora para no repetir la descarga en cada recarga.
     
     Args:
         limit (int): Número máximo de registros a solicitar. Por defecto es 50,000.
@@ -64,30 +109,195 @@ def load_data_from_api(limit: int = 50000) -> pd.DataFrame:
     Raises:
         requests.exceptions.RequestException: Si hay un problema de conexión o respuesta HTTP.
     """
-    api_url = f"https://www.datos.gov.co/resource/nudc-7mev.json?$limit={limit}"
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()  # Verifica si la respuesta fue exitosa
-        data = response.json()
-        df = pd.DataFrame(data)
-        return df
+        return fetch_data(limit)
     except requests.exceptions.RequestException as e:
         st.error(f"Error de conexión: {e}")
     except Exception as e:
         st.error(f"Error inesperado: {e}")
     return pd.DataFrame()
 
+# Estadísticas descriptivas cacheadas según el contenido del DataFrame
+@st.cache_data(show_spinner=False)
+def describe_frame(df: pd.DataFrame) -> pd.DataFrame:
+    return df.describe()
+
+# Resumen rápido sin cuartiles: estadísticas básicas y faltantes a partir del mismo conteo
+@st.cache_data(show_spinner=False)
+def summarize_frame(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Calcula conteo, media, desviación, mínimo y máximo de las columnas numéricas y los valores faltantes.
+
+    Args:
+        df (pd.DataFrame): Datos a resumir.
+
+    Returns:
+        tuple[pd.DataFrame, pd.Series]: Tabla de estadísticas y número de valores faltantes por columna.
+    """
+    estadisticas = df.select_dtypes('number').agg(['count', 'mean', 'std', 'min', 'max'])
+    faltantes = len(df) - df.count()
+    return estadisticas, faltantes
+
+# Limpieza cacheada para no repetir dropna/to_numeric en cada interacción
+@st.cache_data(show_spinner=False)
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte a numéricas todas las columnas excepto departamento y municipio y luego elimina valores nulos.
+
+    Args:
+        df (pd.DataFrame): Datos crudos cargados desde la API.
+
+    Returns:
+        pd.DataFrame: Copia limpia de los datos, con la columna 'Año' si existe 'a_o'.
+    """
+    texto = [col for col in TEXT_COLS if col in df.columns]
+
+    # Conversión numérica en una sola pasada; las demás columnas de texto (p. ej. 'etc') quedan vacías y se descartan
+    numericas = df.drop(columns=texto).apply(pd.to_numeric, errors='coerce').dropna(axis=1, how='all')
+    df_clean = numericas.join(df[texto].astype('category'))
+
+    # Eliminar valores nulos después de la conversión para tratar igual faltantes y no numéricos
+    df_clean = df_clean.dropna().reset_index(drop=True)
+
+    # Transformación de columnas
+    if 'a_o' in df_clean.columns:
+        df_clean['a_o'] = pd.to_numeric(df_clean['a_o'], downcast='integer')
+        df_clean['Año'] = df_clean['a_o'].astype('int16')
+
+    # Códigos y conteos (solo valores enteros) se reducen al entero más pequeño
+    num_cols = df_clean.select_dtypes('number').columns.drop(['a_o', 'Año'], errors='ignore')
+    enteras = num_cols[(df_clean[num_cols] % 1 == 0).all()]
+    df_clean[enteras] = df_clean[enteras].apply(pd.to_numeric, downcast='integer')
+
+    # Métricas en un único bloque float32 con cada columna contigua en memoria para las agregaciones
+    metricas = num_cols.drop(enteras)
+    valores = np.asfortranarray(df_clean[metricas].to_numpy(dtype='float32'))
+    df_clean = pd.DataFrame(valores, columns=metricas).join(df_clean.drop(columns=metricas))
+
+    # Dejar en las categorías solo los valores presentes tras la limpieza
+    return df_clean.assign(**{col: df_clean[col].cat.remove_unused_categories() for col in texto})
+
+# Promedio por departamento de la métrica seleccionada; el caché usa la llave del conjunto de datos
+# y la métrica, sin volver a calcular el hash de todo el DataFrame en cada recarga
+@st.cache_data(show_spinner=False, max_entries=64)
+def top10(_df: pd.DataFrame, dataset_key: str, metric: str) -> pd.Series:
+    return _df.groupby('departamento', observed=True)[metric].mean().nlargest(10)
+
+# Serie anual de la métrica seleccionada, cacheada por llave del conjunto de datos y métrica
+@st.cache_data(show_spinner=False, max_entries=64)
+def yearly_mean(_df: pd.DataFrame, dataset_key: str, metric: str) -> pd.DataFrame:
+    return _df.groupby('Año', as_index=False)[metric].mean()
+
+# Conteos del histograma calculados en el servidor, cacheados por llave del conjunto de datos y métrica
+@st.cache_data(show_spinner=False, max_entries=64)
+def histogram_bins(_df: pd.DataFrame, dataset_key: str, metric: str, bins: int = 30) -> tuple[np.ndarray, np.ndarray]:
+    valores = _df[metric].to_numpy(dtype='float64')
+    return np.histogram(valores[np.isfinite(valores)], bins=bins)
+
+# Cuartiles y bigotes del boxplot (regla de 1.5 veces el rango intercuartílico)
+@st.cache_data(show_spinner=False, max_entries=64)
+def box_stats(_df: pd.DataFrame, dataset_key: str, metric: str) -> dict:
+    """
+    Calcula los estadísticos que dibuja un boxplot sin enviar los datos crudos al navegador.
+
+    Args:
+        _df (pd.DataFrame): Datos limpios (no forman parte de la llave del caché).
+        dataset_key (str): Llave de la carga actual, usada en lugar del hash del DataFrame.
+        metric (str): Columna numérica a resumir.
+
+    Returns:
+        dict: Argumentos q1, median, q3, lowerfence y upperfence para go.Box (vacío si no hay datos).
+    """
+    valores = _df[metric].to_numpy(dtype='float64')
+    valores = valores[np.isfinite(valores)]
+    if valores.size == 0:
+        return {}
+    q1, mediana, q3 = np.percentile(valores, [25, 50, 75])
+    rango = 1.5 * (q3 - q1)
+    return {
+        'q1': [q1],
+        'median': [mediana],
+        'q3': [q3],
+        'lowerfence': [valores[valores >= q1 - rango].min()],
+        'upperfence': [valores[valores <= q3 + rango].max()],
+    }
+
+# Densidad de puntos agregada en una grilla para el mapa de calor
+@st.cache_data(show_spinner=False)
+def density_grid(lat: np.ndarray, lon: np.ndarray, bins: int = 256) -> list:
+    """
+    Agrupa las coordenadas en un histograma 2D y devuelve solo las celdas con puntos.
+
+    Args:
+        lat (np.ndarray): Latitudes de los registros.
+        lon (np.ndarray): Longitudes de los registros.
+        bins (int): Número de divisiones por eje. Por defecto es 256.
+
+    Returns:
+        list: Lista de [lat, lon, peso] con el centro de cada celda y su número de puntos.
+    """
+    counts, lat_edges, lon_edges = np.histogram2d(lat, lon, bins=bins)
+    filas, columnas = np.nonzero(counts)
+    lat_centros = (lat_edges[:-1] + lat_edges[1:]) / 2
+    lon_centros = (lon_edges[:-1] + lon_edges[1:]) / 2
+    return np.column_stack([lat_centros[filas], lon_centros[columnas], counts[filas, columnas]]).tolist()
+
+# Mapa construido una sola vez por conjunto de coordenadas
+@st.cache_resource(show_spinner=False)
+def build_map(coords: np.ndarray) -> "folium.Map":
+    """
+    Crea el mapa con la capa de densidad y la capa de puntos agrupados.
+
+    Args:
+        coords (np.ndarray): Arreglo de dos columnas con latitud y longitud.
+
+    Returns:
+        folium.Map: Mapa listo para mostrarse con st_folium.
+    """
+    # Importaciones diferidas: folium solo se carga cuando se construye el mapa
+    import folium
+    from folium.plugins import FastMarkerCluster, HeatMap
+
+    m = folium.Map(location=[4.6, -74.1], zoom_start=5)
+    HeatMap(density_grid(coords[:, 0], coords[:, 1]), name='Densidad').add_to(m)
+    FastMarkerCluster(coords.tolist(), name='Municipios', show=False).add_to(m)
+    folium.LayerControl().add_to(m)
+    return m
+
+# Archivos de descarga serializados una sola vez por contenido del DataFrame
+@st.cache_data(show_spinner=False)
+def to_xlsx_bytes(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='Datos Procesados')
+    return buffer.getvalue()
+
+@st.cache_data(show_spinner=False)
+def to_parquet_bytes(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine='pyarrow', compression='zstd', index=False)
+    return buffer.getvalue()
+
+# Filas de un departamento según los índices precalculados; vacío si no hay selección
+def department_rows(df: pd.DataFrame, departamento) -> pd.DataFrame:
+    indices = st.session_state['dept_groups'].get(departamento, np.array([], dtype=np.intp))
+    return df.take(indices)
+
 # Función para mostrar información sobre los datos
-def show_data_summary(df):
+def show_data_summary(df, key):
     st.subheader("📊 Resumen Estadístico de los Datos")
     st.write(f"Total de registros: {len(df)}")
     st.write("### Estadísticas Descriptivas:")
-    st.dataframe(df.describe())
+    estadisticas, missing_values = summarize_frame(df)
+
+    # Los cuartiles requieren ordenar cada columna, solo se calculan si se piden
+    if st.checkbox("Incluir cuartiles", key=f"cuartiles_{key}"):
+        estadisticas = describe_frame(df)
+    st.dataframe(estadisticas)
     
     st.markdown("---")
     
     # Verificar si hay valores nulos
-    missing_values = df.isnull().sum()
     st.write("### Valores Faltantes por Columna:")
     st.write(missing_values)
 
@@ -95,6 +305,9 @@ def show_data_summary(df):
 
 # Función principal para toda la lógica de la aplicación
 def main():
+    # Aplicando el estilo
+    st.markdown(_CSS, unsafe_allow_html=True)
+
     st.title("📊 Análisis Interactivo de Datos Educativos")
 
     # Paso 1: Subir los datos
@@ -105,42 +318,45 @@ def main():
             
         if not df.empty:
             st.success(f"Datos cargados exitosamente ({len(df)} filas)")
-            st.dataframe(df.head())
             st.session_state['df'] = df  # Guardamos los datos en la sesión para uso posterior
-
-            # Mostrar resumen de los datos
-            show_data_summary(df)
+            # La llave del conjunto, las opciones e índices por departamento se recalculan con los nuevos datos
+            for key in ['dataset_key', 'dept_options', 'dept_groups']:
+                st.session_state.pop(key, None)
         else:
             st.warning("No se encontraron datos o hubo un error en la carga.")
 
+    # Resumen de los datos cargados, visible también en las recargas posteriores al botón
+    if 'df' in st.session_state:
+        df = st.session_state['df']
+        st.dataframe(df.head())
+        show_data_summary(df, 'df')
+
     # Paso 2: Limpieza y Transformación de Datos
     if 'df' in st.session_state:
         st.header("🔧 Limpieza y Transformación de Datos")
 
-        df = st.session_state['df']
-
-        # Transformación de columnas
-        if 'a_o' in df.columns:
-            df['Año'] = pd.to_datetime(df['a_o'], format='%Y')
-        
-        # Eliminar valores nulos y transformar columnas a valores numéricos
-        df_clean = df.dropna()
-        for col in df_clean.columns:
-            if col not in ['departamento', 'municipio']:
-                df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
+        df_clean = clean_frame(st.session_state['df'])
 
         st.success(f"Datos limpios: {len(df_clean)} registros")
         st.dataframe(df_clean.head())
 
         st.session_state['df_clean'] = df_clean  # Guardamos los datos transformados
+        if 'dataset_key' not in st.session_state:
+            # Identifica esta carga en los cachés que no calculan el hash del DataFrame
+            st.session_state['dataset_key'] = uuid.uuid4().hex
+        if 'dept_options' not in st.session_state:
+            st.session_state['dept_options'] = df_clean['departamento'].cat.categories.tolist()
+        if 'dept_groups' not in st.session_state:
+            # Posiciones de las filas de cada departamento para filtrar sin recorrer todo el DataFrame
+            st.session_state['dept_groups'] = df_clean.groupby('departamento', observed=True).indices
 
         # Mostrar el resumen de los datos limpios
-        show_data_summary(df_clean)
+        show_data_summary(df_clean, 'df_clean')
 
         # Filtros avanzados
         st.subheader("🔎 Filtros avanzados para explorar los datos")
-        departamento_filter = st.selectbox("Selecciona un Departamento", df_clean['departamento'].unique())
-        df_filtered = df_clean[df_clean['departamento'] == departamento_filter]
+        departamento_filter = st.selectbox("Selecciona un Departamento", st.session_state['dept_options'])
+        df_filtered = department_rows(df_clean, departamento_filter)
         st.dataframe(df_filtered)
 
     # Paso 3: Visualización de Datos
@@ -150,43 +366,45 @@ def main():
         df_clean = st.session_state['df_clean']
         
         # Selección de métricas
-        metrics = df_clean.columns.to_list()
+        metrics = df_clean.select_dtypes('number').columns.drop('Año', errors='ignore').to_list()
         selected_metric = st.selectbox("Selecciona una métrica para visualizar", metrics)
 
         # Crear gráfico de la métrica seleccionada
-        fig = px.line(df_clean, x='Año', y=selected_metric, title=f'Visualización de {selected_metric}')
-        st.plotly_chart(fig)
+        fig = px.line(yearly_mean(df_clean, st.session_state['dataset_key'], selected_metric), x='Año', y=selected_metric, title=f'Visualización de {selected_metric}')
+        st.plotly_chart(fig, use_container_width=True)
 
         st.markdown("---")
 
         # Gráfico de barras para mostrar la comparación de departamentos
         st.subheader(f"📊 Comparativa de {selected_metric} por Departamento")
-        deptos_avg = df_clean.groupby('departamento')[selected_metric].mean().sort_values(ascending=False).head(10)
+        deptos_avg = top10(df_clean, st.session_state['dataset_key'], selected_metric)
         fig2 = px.bar(deptos_avg, x=deptos_avg.index, y=selected_metric, title=f"Top 10 Departamentos por {selected_metric}")
-        st.plotly_chart(fig2)
+        st.plotly_chart(fig2, use_container_width=True)
 
         st.markdown("---")
 
         # Gráfico de dispersión para explorar relaciones entre métricas
         if 'departamento' in df_clean.columns:
-            deptos = df_clean['departamento'].unique()
-            selected_depto = st.selectbox("Selecciona un departamento para la visualización de dispersión", deptos)
+            selected_depto = st.selectbox("Selecciona un departamento para la visualización de dispersión", st.session_state['dept_options'])
 
-            depto_df = df_clean[df_clean['departamento'] == selected_depto]
-            scatter_fig = px.scatter(depto_df, x='Año', y=selected_metric, title=f"Dispersión de {selected_metric} en {selected_depto}")
-            st.plotly_chart(scatter_fig)
+            depto_df = department_rows(df_clean, selected_depto)
+            scatter_fig = px.scatter(depto_df, x='Año', y=selected_metric, title=f"Dispersión de {selected_metric} en {selected_depto}", render_mode='webgl')
+            st.plotly_chart(scatter_fig, use_container_width=True)
 
         st.markdown("---")
 
         # Histogramas para mostrar la distribución de los datos
         st.subheader(f"📊 Histograma de {selected_metric}")
-        fig3 = px.histogram(df_clean, x=selected_metric, nbins=30, title=f"Distribución de {selected_metric}")
-        st.plotly_chart(fig3)
+        counts, edges = histogram_bins(df_clean, st.session_state['dataset_key'], selected_metric)
+        fig3 = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges)))
+        fig3.update_layout(title=f"Distribución de {selected_metric}", xaxis_title=selected_metric, yaxis_title='count', bargap=0)
+        st.plotly_chart(fig3, use_container_width=True)
 
         # Boxplot para explorar la variabilidad de los datos
         st.subheader(f"📊 Boxplot de {selected_metric}")
-        fig4 = px.box(df_clean, y=selected_metric, title=f"Rango y Distribución de {selected_metric}")
-        st.plotly_chart(fig4)
+        fig4 = go.Figure(go.Box(name=selected_metric, **box_stats(df_clean, st.session_state['dataset_key'], selected_metric)))
+        fig4.update_layout(title=f"Rango y Distribución de {selected_metric}")
+        st.plotly_chart(fig4, use_container_width=True)
 
     # Paso 4: Crear Mapa Interactivo
     if 'df_clean' in st.session_state:
@@ -194,20 +412,13 @@ def main():
 
         df_clean = st.session_state['df_clean']
         
-        # Crear mapa
-        map = folium.Map(location=[4.6, -74.1], zoom_start=5)
-        
-        # Agregar puntos de los municipios
-        for _, row in df_clean.iterrows():
-            folium.CircleMarker(
-                location=[row['lat'], row['lon']],  # Asegúrate de que estas columnas existan
-                radius=5,
-                color='blue',
-                fill=True,
-                fill_color='blue'
-            ).add_to(map)
-
-        st_folium(map, width=750, height=500)
+        # Mapa de calor con la densidad precalculada y puntos agrupados como capa opcional
+        coords = df_clean[['lat', 'lon']].dropna().to_numpy()  # Asegúrate de que estas columnas existan
+
+        from streamlit_folium import st_folium
+
+        # Sin objetos de retorno: el mapa no se reenvía a Python en cada interacción
+        st_folium(build_map(coords), width=750, height=500, returned_objects=[])
 
     # Paso 5: Descarga de Datos Procesados
     if 'df_clean' in st.session_state:
@@ -215,18 +426,21 @@ def main():
 
         df_clean = st.session_state['df_clean']
 
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df_clean.to_excel(writer, index=False, sheet_name='Datos Procesados')
-        output.seek(0)
-
         st.download_button(
             label="📥 Descargar Datos Procesados",
-            data=output,
+            data=to_xlsx_bytes(df_clean),
             file_name='datos_procesados.xlsx',
             mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
 
+        # Parquet: columnar y comprimido, mucho más liviano que el Excel
+        st.download_button(
+            label="📥 Descargar Datos Procesados (Parquet)",
+            data=to_parquet_bytes(df_clean),
+            file_name='datos_procesados.parquet',
+            mime='application/vnd.apache.parquet'
+        )
+
 # Ejecutar la función principal
 if __name__ == "__main__":
     main()
@@ -0,0 +1,111 @@
+import importlib.util
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+RUTA = Path(__file__).resolve().parents[1] / "Código" / "Ejercicio2_dashboard.py"
+spec = importlib.util.spec_from_file_location("dashboard", RUTA)
+dashboard = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(dashboard)
+
+# CSV con el formato de Socrata: encabezados con los nombres de campo y todos los valores entre comillas
+CSV = (
+    '"a_o","c_digo_departamento","departamento","c_digo_municipio","municipio","etc",'
+    '"poblaci_n_5_16","cobertura_neta","deserci_n","lat","lon"\n'
+    '"2011","5","Antioquia","5001","Medellín","Medellín","412000","95.5","2.1","6.25","-75.56"\n'
+    '"2012","5","Antioquia","5002","Abejorral","Antioquia","4100","88.25","ND","5.79","-75.43"\n'
+    '"2012","8","Atlántico","8001","Barranquilla","Barranquilla","250000","ND","3.4","10.96","-74.80"\n'
+    '"2013","11","Bogotá, D.C.","11001","Bogotá, D.C.","Bogotá, D.C.","1300000","97.75","1.8","4.61","-74.08"\n'
+).encode("utf-8")
+
+
+def test_clean_frame_descarta_texto_y_valores_no_numericos():
+    df_clean = dashboard.clean_frame(dashboard.parse_csv(CSV))
+
+    # 'etc' es texto: se descarta en lugar de quedar como métrica vacía
+    assert "etc" not in df_clean.columns
+    # Las filas con "ND", en columnas de SCHEMA o fuera de él, se eliminan
+    assert len(df_clean) == 2
+    assert "Atlántico" not in df_clean["departamento"].cat.categories
+    assert "Abejorral" not in df_clean["municipio"].cat.categories
+    assert not df_clean.isna().any().any()
+    assert np.isfinite(df_clean["cobertura_neta"].to_numpy()).all()
+
+
+def test_clean_frame_conserva_enteros_y_reduce_metricas_a_float32():
+    df_clean = dashboard.clean_frame(dashboard.parse_csv(CSV))
+
+    for col in ["c_digo_departamento", "c_digo_municipio", "poblaci_n_5_16", "a_o", "Año"]:
+        assert df_clean[col].dtype.kind == "i", col
+    assert df_clean["c_digo_municipio"].tolist() == [5001, 11001]
+    for col in ["cobertura_neta", "deserci_n", "lat", "lon"]:
+        assert df_clean[col].dtype == np.float32, col
+
+
+def test_histograma_y_boxplot_ignoran_valores_no_finitos():
+    df = pd.DataFrame({"metrica": [1.0, np.nan, 3.0, 5.0], "vacia": [np.nan] * 4})
+
+    dashboard.histogram_bins.clear()
+    dashboard.box_stats.clear()
+
+    counts, edges = dashboard.histogram_bins(df, "carga-1", "metrica", bins=2)
+    assert counts.tolist() == [1, 2]
+    assert np.isfinite(edges).all()
+    assert dashboard.histogram_bins(df, "carga-1", "vacia")[0].sum() == 0
+
+    stats = dashboard.box_stats(df, "carga-1", "metrica")
+    assert stats["median"] == [3.0]
+    assert stats["lowerfence"] == [1.0] and stats["upperfence"] == [5.0]
+    assert dashboard.box_stats(df, "carga-1", "vacia") == {}
+
+
+def test_top10_no_recalcula_hash_del_dataframe():
+    df = pd.DataFrame({
+        "departamento": pd.Categorical(["A", "B", "A", "C"]),
+        "metrica": [1.0, 2.0, 2.0, 4.0],
+    })
+    dashboard.top10.clear()
+
+    with mock.patch("pandas.util.hash_pandas_object") as hash_frame, \
+            mock.patch.object(pd.DataFrame, "groupby", autospec=True, side_effect=pd.DataFrame.groupby) as groupby:
+        primero = dashboard.top10(df, "carga-1", "metrica")
+        segundo = dashboard.top10(df, "carga-1", "metrica")
+
+    assert hash_frame.call_count == 0
+    assert groupby.call_count == 1
+    pd.testing.assert_series_equal(primero, segundo)
+    assert primero.index.tolist() == ["C", "B", "A"]
+
+
+def test_yearly_mean_no_recalcula_hash_del_dataframe():
+    df = pd.DataFrame({"Año": [2011, 2011, 2012], "metrica": [1.0, 3.0, 5.0]})
+    dashboard.yearly_mean.clear()
+
+    with mock.patch("pandas.util.hash_pandas_object") as hash_frame, \
+            mock.patch.object(pd.DataFrame, "groupby", autospec=True, side_effect=pd.DataFrame.groupby) as groupby:
+        primero = dashboard.yearly_mean(df, "carga-1", "metrica")
+        segundo = dashboard.yearly_mean(df, "carga-1", "metrica")
+
+    assert hash_frame.call_count == 0
+    assert groupby.call_count == 1
+    pd.testing.assert_frame_equal(primero, segundo)
+    assert primero["metrica"].tolist() == [2.0, 5.0]
+
+
+def test_histograma_y_boxplot_no_recalculan_hash_del_dataframe():
+    df = pd.DataFrame({"metrica": [1.0, 2.0, 3.0, 4.0]})
+    dashboard.histogram_bins.clear()
+    dashboard.box_stats.clear()
+
+    with mock.patch("pandas.util.hash_pandas_object") as hash_frame, \
+            mock.patch.object(np, "histogram", side_effect=np.histogram) as histogram, \
+            mock.patch.object(np, "percentile", side_effect=np.percentile) as percentile:
+        for _ in range(2):
+            dashboard.histogram_bins(df, "carga-1", "metrica")
+            dashboard.box_stats(df, "carga-1", "metrica")
+
+    assert hash_frame.call_count == 0
+    assert histogram.call_count == 1
+    assert percentile.call_count == 1
@@ -158,7 +158,7 @@ def show_transform_tab():
     st.plotly_chart(fig, use_container_width=True)
 
     cobertura_depto = df_fact.merge(dim_geo, on='id_geo') \
-        .groupby('departamento')['cobertura_neta'].mean().sort_values(ascending=False).head(10)
+        .groupby('departamento', observed=True)['cobertura_neta'].mean().sort_values(ascending=False).head(10)
     st.markdown("**🏛️ Top Departamentos por Cobertura Neta Promedio**")
     st.dataframe(cobertura_depto.reset_index())
 
@@ -181,6 +181,6 @@ def show_transform_tab():
     st.subheader("📈 Resumen por Departamento y Año")
 
     df_fact_ext = df_fact.merge(dim_geo, on='id_geo').merge(dim_tiempo, on='id_tiempo')
-    resumen = df_fact_ext.groupby(['departamento', 'a_o'])[
+    resumen = df_fact_ext.groupby(['departamento', 'a_o'], observed=True)[
         ['tasa_matriculaci_n_5_16', 'cobertura_neta', 'cobertura_bruta']].mean().reset_index()
     st.dataframe(resumen.head(20))